@@ -2,24 +2,84 @@ import sys
 import os
 import time
 import gc
+import queue
+import logging
 from pathlib import Path
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFileDialog, QTextEdit, QStackedWidget,
-    QGroupBox, QProgressBar, QMessageBox, QComboBox,
+    QGroupBox, QProgressBar, QMessageBox, QComboBox, QCheckBox, QSpinBox,
     QFrame, QSizePolicy
 )
-from PySide6.QtCore import Qt, Signal, QThread, QTimer
-from PySide6.QtGui import QFont
-import torch
+from PySide6.QtCore import Qt, Signal, QThread, QElapsedTimer, QSettings, QTimer
+from PySide6.QtGui import QFont, QFontDatabase, QTextCursor
 
-# 导入模型（确保model.py在当前目录）
-try:
-    from model import FunASRNano
-    MODEL_AVAILABLE = True
-except ImportError as e:
-    print(f"无法导入模型: {e}")
-    MODEL_AVAILABLE = False
+log = logging.getLogger(__name__)
+
+# torch和模型模块导入较慢，由PreloadThread在后台导入，避免阻塞窗口显示
+torch = None
+FunASRNano = None
+load_audio_text_image_video = None
+MODEL_AVAILABLE = False
+# CUDA是否可用，预加载时查询一次
+CUDA_AVAILABLE = False
+
+# 用户主目录，仅在启动时计算一次，作为文件对话框的默认目录
+HOME_DIR = str(Path.home())
+
+# 已加载模型缓存，键为 (模型目录, 设备, 精度, 是否编译)，值为 (model, kwargs)；每个设备上最多保留一个
+_MODEL_CACHE = {}
+
+
+def _autocast(kwargs):
+    """按模型精度返回推理用的autocast，处理FP32适配器与半精度子模块之间的混合精度"""
+    device_type = torch.device(kwargs.get("device", "cuda")).type
+    dtype = torch.float16 if kwargs.get("fp16", False) else torch.bfloat16
+    enabled = bool(kwargs.get("fp16", False) or kwargs.get("bf16", False))
+    return torch.autocast(device_type=device_type, dtype=dtype, enabled=enabled)
+
+
+class PreloadThread(QThread):
+    """预加载线程，在后台导入torch和模型模块"""
+    preload_finished = Signal(bool, str)  # model_available, error
+    
+    def run(self):
+        global torch, FunASRNano, load_audio_text_image_video, MODEL_AVAILABLE, CUDA_AVAILABLE
+        try:
+            # 分配器配置必须在导入torch之前设置，可减少反复加载模型造成的显存碎片；
+            # expandable_segments在Windows上不受支持，只在其他平台启用
+            alloc_conf = "max_split_size_mb:128"
+            if sys.platform != "win32":
+                alloc_conf = "expandable_segments:True," + alloc_conf
+            os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", alloc_conf)
+            import torch
+            CUDA_AVAILABLE = torch.cuda.is_available()
+            # 全局设置只需在启动时配置一次
+            torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+            torch.set_float32_matmul_precision("high")
+            if CUDA_AVAILABLE:
+                # 音频长度各不相同，关闭cuDNN按形状自动调优；允许TF32加速FP32矩阵运算
+                torch.backends.cudnn.benchmark = False
+                torch.backends.cudnn.deterministic = False
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
+                # 可选：通过环境变量限制显存占用比例（如0.85），超出时直接报显存不足而不是拖慢整个系统
+                fraction = os.environ.get("FUNASR_NANO_GPU_MEMORY_FRACTION")
+                if fraction:
+                    try:
+                        torch.cuda.set_per_process_memory_fraction(float(fraction))
+                    except (ValueError, RuntimeError) as e:
+                        log.warning("忽略无效的显存占用比例 %s: %s", fraction, e)
+            
+            # 导入模型（确保model.py在当前目录）
+            from model import FunASRNano
+            from funasr.utils.load_utils import load_audio_text_image_video
+            MODEL_AVAILABLE = True
+            self.preload_finished.emit(True, "")
+        except Exception as e:
+            log.exception("无法导入模型: %s", e)
+            MODEL_AVAILABLE = False
+            self.preload_finished.emit(False, str(e))
 
 
 class WorkerThread(QThread):
@@ -27,18 +87,29 @@ class WorkerThread(QThread):
     progress_signal = Signal(str, int, int, str)  # stage, value, total, message
     finished_signal = Signal(object, object, bool, str)  # model, kwargs, success, message
     
-    def __init__(self, model_dir, device):
+    def __init__(self, model_path, device, compile_model=False, precision="fp32"):
         super().__init__()
-        self.model_dir = model_dir
+        self.model_path = model_path
         self.device = device
+        self.compile_model = compile_model
+        self.precision = precision  # "fp32" / "fp16"(仅GPU) / "bf16"
         
     def run(self):
         try:
             self.progress_signal.emit("检查模型路径", 10, 100, "正在检查模型路径...")
-            model_dir = os.path.abspath(self.model_dir)
+            # 目录是否存在已在页面中检查过，这里只解析一次绝对路径
+            model_dir = os.fspath(self.model_path.resolve())
             
-            if not os.path.isdir(model_dir):
-                self.finished_signal.emit(None, None, False, f"模型目录不存在: {model_dir}")
+            precision = self.precision
+            if precision == "fp16" and not self.device.startswith("cuda"):
+                precision = "fp32"
+            cache_key = (model_dir, self.device, precision, self.compile_model)
+            
+            # 相同配置的模型已在缓存中，直接复用
+            if cache_key in _MODEL_CACHE:
+                m, kwargs = _MODEL_CACHE[cache_key]
+                self.progress_signal.emit("完成", 100, 100, "已从缓存加载模型！")
+                self.finished_signal.emit(m, kwargs, True, "已从缓存加载模型！")
                 return
                 
             self.progress_signal.emit("加载模型", 30, 100, "正在加载模型...")
@@ -46,35 +117,155 @@ class WorkerThread(QThread):
                 self.finished_signal.emit(None, None, False, "模型模块无法导入，请检查model.py")
                 return
                 
+            # 每个设备上只保留一个缓存模型，加载新模型前先释放该设备上的其他模型，避免显存或内存中同时存在两份
+            evicted = [_MODEL_CACHE.pop(key) for key in list(_MODEL_CACHE) if key[1] == self.device]
+            if evicted:
+                self.progress_signal.emit("释放内存", 20, 100, "正在释放该设备上的其他缓存模型...")
+                UnloadThread.release_models(evicted)
+                
             m, kwargs = FunASRNano.from_pretrained(model=model_dir, device=self.device)
             m.eval()
+            # 纯推理场景，确保所有参数都不记录梯度
+            for p in m.parameters():
+                p.requires_grad_(False)
             
-            # 加载完成后立即进行垃圾回收
-            self.progress_signal.emit("清理内存", 95, 100, "正在清理内存...")
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-                torch.cuda.ipc_collect()
+            # 半精度：编码器和LLM转为FP16(GPU)或BF16(CPU)，适配器保持FP32，推理时由autocast处理混合精度
+            if precision != "fp32":
+                dtype = torch.float16 if precision == "fp16" else torch.bfloat16
+                self.progress_signal.emit("转换精度", 70, 100, f"正在转换模型为{precision.upper()}...")
+                m.audio_encoder.to(dtype)
+                m.llm.to(dtype)
+                kwargs[precision] = True
+            
+            # 一次性编译模型，后续每次转录都直接使用编译后的图
+            if self.compile_model:
+                self.progress_signal.emit("编译模型", 80, 100, "正在编译模型 (首次较慢)...")
+                self._compile_model(m, kwargs)
+            
+            _MODEL_CACHE[cache_key] = (m, kwargs)
             
             self.progress_signal.emit("完成", 100, 100, "模型加载成功！")
             self.finished_signal.emit(m, kwargs, True, "模型加载成功！")
             
         except Exception as e:
             self.finished_signal.emit(None, None, False, f"模型加载失败: {str(e)}")
+            
+    def _compile_model(self, m, kwargs):
+        """原地编译各子模块并用一段静音预热，编译失败时回退到eager模式"""
+        modules = [
+            module for module in (getattr(m, name, None) for name in ("audio_encoder", "audio_adaptor", "llm"))
+            if module is not None
+        ]
+        try:
+            # 音频长度不固定，使用dynamic避免每个长度都重新编译
+            for module in modules:
+                module.compile(dynamic=True)
+            # compile()只安装包装，Dynamo/Inductor在第一次前向时才真正编译，因此在加载阶段预热一次
+            fs = getattr(kwargs.get("frontend"), "fs", 16000)
+            with torch.inference_mode(), _autocast(kwargs):
+                m.inference(data_in=[torch.zeros(fs)], **{**kwargs, "max_length": 8})
+        except Exception as e:
+            # 例如缺少Triton等编译后端，恢复为未编译的前向，避免缓存一个无法推理的模型
+            log.warning("编译模型失败，使用未编译模型: %s", e)
+            for module in modules:
+                module._compiled_call_impl = None
+
+
+class UnloadThread(QThread):
+    """卸载线程，在后台释放模型和GPU缓存，避免阻塞界面"""
+    
+    def __init__(self, entries):
+        super().__init__()
+        self.entries = entries  # [(model, kwargs), ...]
+        
+    def run(self):
+        try:
+            log.info("开始清除缓存模型...")
+            self.release_models(self.entries)
+            log.info("缓存模型清除完成")
+            
+        except Exception:
+            log.exception("清除缓存模型时出错")
+            
+    @staticmethod
+    def release_models(entries):
+        """依次释放列表中的模型并清理GPU缓存，也供加载线程在同一线程内直接调用"""
+        while entries:
+            model, model_kwargs = entries.pop()
+            UnloadThread._release_model(model, model_kwargs)
+            # 删除最后一个引用，整个模块树由引用计数直接释放
+            del model, model_kwargs
+        
+        # 强制垃圾回收
+        gc.collect()
+        
+        # 等待GPU上未完成的操作结束后清理GPU缓存
+        if CUDA_AVAILABLE:
+            torch.cuda.synchronize()
+            torch.cuda.empty_cache()
+            
+    @staticmethod
+    def _release_model(model, model_kwargs):
+        """拆解单个模型，释放其占用的张量"""
+        # 1. 清除进度回调
+        if hasattr(model, 'set_progress_callback'):
+            model.set_progress_callback(None)
+            model.set_partial_result_callback(None)
+        
+        # 2. 切换到模型所在设备，使后续empty_cache作用于该设备；
+        #    权重不拷回CPU，丢弃最后一个引用即可释放显存，拷贝反而会占用锁页内存
+        param = next(model.parameters(), None)
+        if param is not None and param.is_cuda:
+            torch.cuda.set_device(param.device)
+        
+        # 3. 清空kwargs，其中的张量（CMVN等）与tokenizer、前端一起失去引用，
+        #    确保在empty_cache之前没有残留的强引用
+        if model_kwargs is not None:
+            model_kwargs.clear()
+
+
+class AudioPrefetchThread(QThread):
+    """音频预取线程，GPU推理当前批次时在CPU上解码后续批次"""
+    
+    def __init__(self, batches, fs, out_queue):
+        super().__init__()
+        self.batches = batches
+        self.fs = fs
+        self.out_queue = out_queue
+        
+    def run(self):
+        for batch in self.batches:
+            if self.isInterruptionRequested():
+                return
+            # 逐个解码，单个文件失败时放入异常，不影响同批其他文件
+            waveforms = []
+            for p in batch:
+                try:
+                    waveforms.append(load_audio_text_image_video(os.fspath(p), fs=self.fs))
+                except Exception as e:
+                    waveforms.append(e)
+            self.out_queue.put((batch, waveforms))
+        # 结束标记
+        self.out_queue.put(None)
 
 
 class TranscriptionThread(QThread):
     """转录工作线程"""
     progress_signal = Signal(str, int, int, str)  # stage, value, total, message
     result_signal = Signal(str, bool, str)  # result, success, message
+    partial_result_signal = Signal(str)  # partial text
     
-    def __init__(self, model, kwargs, audio_path, output_path=None):
+    def __init__(self, model, kwargs, audio_paths, output_path=None, batch_size=1):
         super().__init__()
         self.model = model
         self.kwargs = kwargs
-        self.audio_path = audio_path
+        self.audio_paths = audio_paths
         self.output_path = output_path
+        self.batch_size = max(1, batch_size)
         self.start_time = None
+        # 当前批次序号和总批数，用于把每批0~100的进度换算为整体进度
+        self._batch_idx = 0
+        self._n_batches = 1
         
     def run(self):
         try:
@@ -82,45 +273,109 @@ class TranscriptionThread(QThread):
             
             # 设置进度回调
             self.model.set_progress_callback(self._progress_callback)
+            # 只有单个文件时流式显示部分结果，多个文件等全部完成后再按文件显示
+            self.model.set_partial_result_callback(
+                self.partial_result_signal.emit if len(self.audio_paths) == 1 else None
+            )
             
             self.progress_signal.emit("准备音频", 5, 100, "正在准备音频文件...")
             
-            # 检查音频文件是否存在
-            if not os.path.isfile(self.audio_path):
-                self.result_signal.emit("", False, f"音频文件不存在: {self.audio_path}")
+            # 按批大小分批推理，每批只调用一次model.inference
+            batches = [
+                self.audio_paths[i:i + self.batch_size]
+                for i in range(0, len(self.audio_paths), self.batch_size)
+            ]
+            self._n_batches = len(batches)
+            result = self._run_batches(batches)
+            if result is None:
+                self.result_signal.emit("", False, "无法解析识别结果")
+                return
+            texts, failed = result
+            if failed == len(self.audio_paths):
+                self.result_signal.emit("", False, texts[0] if failed == 1 else "所有音频文件均解码失败")
                 return
                 
-            # 执行推理
-            res = self.model.inference(data_in=[self.audio_path], **self.kwargs)
+            # 计算耗时
+            elapsed_time = time.time() - self.start_time
+            failed_note = f"，{failed}个文件解码失败" if failed else ""
             
-            # 解析结果
-            if isinstance(res, tuple) and len(res) > 0 and isinstance(res[0], list) and len(res[0]) > 0:
-                text = res[0][0].get("text", "未找到文本")
-                text = text.strip()
-                
-                # 计算耗时
-                elapsed_time = time.time() - self.start_time
+            # 多个文件时按文件名分段显示
+            if len(self.audio_paths) == 1:
+                text = texts[0]
+            else:
+                text = "\n\n".join(
+                    f"【{audio_path.name}】\n{file_text}"
+                    for audio_path, file_text in zip(self.audio_paths, texts)
+                )
                 
-                # 如果指定了输出文件，保存结果
-                if self.output_path:
-                    try:
-                        with open(self.output_path, 'w', encoding='utf-8') as f:
-                            f.write(f"音频文件: {self.audio_path}\n")
-                            f.write(f"识别结果:\n{text}\n")
-                            f.write(f"处理时间: {elapsed_time:.2f}秒\n")
-                        self.result_signal.emit(text, True, f"转录完成！耗时{elapsed_time:.1f}秒，结果已保存到: {self.output_path}")
-                    except Exception as e:
-                        self.result_signal.emit(text, True, f"转录完成！耗时{elapsed_time:.1f}秒，但保存文件失败: {str(e)}")
-                else:
-                    self.result_signal.emit(text, True, f"转录完成！耗时{elapsed_time:.1f}秒")
+            # 如果指定了输出文件，保存结果
+            if self.output_path:
+                try:
+                    with open(self.output_path, 'w', encoding='utf-8') as f:
+                        for audio_path, file_text in zip(self.audio_paths, texts):
+                            f.write(f"音频文件: {audio_path}\n")
+                            f.write(f"识别结果:\n{file_text}\n")
+                        f.write(f"处理时间: {elapsed_time:.2f}秒\n")
+                    self.result_signal.emit(text, True, f"转录完成！耗时{elapsed_time:.1f}秒{failed_note}，结果已保存到: {self.output_path}")
+                except Exception as e:
+                    self.result_signal.emit(text, True, f"转录完成！耗时{elapsed_time:.1f}秒{failed_note}，但保存文件失败: {str(e)}")
             else:
-                self.result_signal.emit("", False, "无法解析识别结果")
+                self.result_signal.emit(text, True, f"转录完成！耗时{elapsed_time:.1f}秒{failed_note}")
                 
         except Exception as e:
             self.result_signal.emit("", False, f"转录过程中发生错误: {str(e)}")
             
+    def _run_batches(self, batches):
+        """预取线程解码音频，当前线程依次推理，返回(各文件文本, 解码失败数)，解析失败时返回None"""
+        fs = getattr(self.kwargs.get("frontend"), "fs", 16000)
+        # 队列长度限制为2，避免一次性解码全部音频占满内存
+        audio_queue = queue.Queue(maxsize=2)
+        prefetch = AudioPrefetchThread(batches, fs, audio_queue)
+        prefetch.start()
+        
+        texts = []
+        failed = 0
+        try:
+            while True:
+                item = audio_queue.get()
+                if item is None:
+                    break
+                batch, waveforms = item
+                decoded = [w for w in waveforms if not isinstance(w, Exception)]
+                
+                batch_texts = iter(())
+                if decoded:
+                    # 执行推理（inference_mode下不记录autograd信息）
+                    with torch.inference_mode(), _autocast(self.kwargs):
+                        res = self.model.inference(data_in=decoded, **self.kwargs)
+                    
+                    # 解析结果
+                    if not (isinstance(res, tuple) and len(res) > 0 and isinstance(res[0], list) and len(res[0]) == len(decoded)):
+                        return None
+                    batch_texts = (r.get("text", "未找到文本").strip() for r in res[0])
+                    
+                # 按原顺序合并，解码失败的文件记录错误信息，其余文件的结果照常保留
+                for audio_path, w in zip(batch, waveforms):
+                    if isinstance(w, Exception):
+                        failed += 1
+                        texts.append(f"音频解码失败 ({audio_path.name}): {w}")
+                    else:
+                        texts.append(next(batch_texts))
+                self._batch_idx += 1
+        finally:
+            # 提前退出时取走队列中的数据，让预取线程能够结束
+            prefetch.requestInterruption()
+            while not prefetch.wait(50):
+                try:
+                    audio_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                    
+        return texts, failed
+            
     def _progress_callback(self, stage, value, total, message):
-        """模型进度回调"""
+        """模型进度回调，每批的进度按批次换算为整体进度"""
+        value = (self._batch_idx * total + value) // self._n_batches
         self.progress_signal.emit(stage, value, total, message)
 
 
@@ -128,10 +383,34 @@ class ModelLoadPage(QWidget):
     """模型加载页面"""
     model_loaded = Signal(object, object, str)  # model, kwargs, model_dir
     
+    # 加载按钮样式
+    _LOAD_BTN_QSS = """
+        QPushButton {
+            background-color: #4CAF50;
+            color: white;
+            font-size: 14px;
+            padding: 10px;
+            border-radius: 4px;
+            border: none;
+        }
+        QPushButton:hover {
+            background-color: #45a049;
+        }
+        QPushButton:disabled {
+            background-color: #cccccc;
+        }
+    """
+    
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
         self.worker = None
+        self.elapsed = QElapsedTimer()
+        self._running = False
+        # 记住上次选择的目录
+        self.settings = QSettings("FunASR", "Nano")
+        self._last_model_dir = self.settings.value("last_model_dir", HOME_DIR)
+        self._model_path = None
         self.init_ui()
         
     def init_ui(self):
@@ -189,13 +468,22 @@ class ModelLoadPage(QWidget):
         self.device_combo = QComboBox()
         self.device_combo.addItem("自动选择 (优先使用GPU)")
         self.device_combo.addItem("CPU")
+        self.device_combo.addItem("CPU (BF16)")
         self.device_combo.addItem("GPU (CUDA)")
+        self.device_combo.addItem("GPU (CUDA, FP16)")
         self.device_combo.setMaximumWidth(200)
+        self.device_combo.currentTextChanged.connect(self.update_compile_option)
         
         device_layout.addWidget(self.device_combo)
         device_layout.addStretch()
         model_layout.addLayout(device_layout)
         
+        # 模型编译选项（仅对GPU有明显加速）
+        self.compile_check = QCheckBox("编译模型 (torch.compile，首次加载较慢)")
+        self.compile_check.setChecked(False)
+        self.compile_check.setEnabled(False)
+        model_layout.addWidget(self.compile_check)
+        
         model_group.setLayout(model_layout)
         layout.addWidget(model_group)
         
@@ -225,28 +513,18 @@ class ModelLoadPage(QWidget):
         
         # 加载按钮
         self.load_btn = QPushButton("加载模型")
-        self.load_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                font-size: 14px;
-                padding: 10px;
-                border-radius: 4px;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-            QPushButton:disabled {
-                background-color: #cccccc;
-            }
-        """)
+        self.load_btn.setStyleSheet(self._LOAD_BTN_QSS)
         self.load_btn.clicked.connect(self.load_model)
         self.load_btn.setMinimumHeight(40)
         layout.addWidget(self.load_btn)
         
+        # 清除缓存按钮
+        self.clear_cache_btn = QPushButton("清除缓存模型")
+        self.clear_cache_btn.clicked.connect(self.clear_model_cache)
+        layout.addWidget(self.clear_cache_btn)
+        
         # 底部信息
-        info_label = QLabel("提示：加载新模型时会自动卸载当前模型")
+        info_label = QLabel("提示：已加载的模型会保留在缓存中，再次加载相同模型无需等待；点击“清除缓存模型”释放内存")
         info_label.setStyleSheet("color: #666; font-size: 11px; padding: 8px;")
         info_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(info_label)
@@ -258,12 +536,34 @@ class ModelLoadPage(QWidget):
         """浏览选择模型目录"""
         dir_path = QFileDialog.getExistingDirectory(
             self, "选择模型目录", 
-            str(Path.home()),
+            self._last_model_dir,
             QFileDialog.ShowDirsOnly
         )
         if dir_path:
+            self._model_path = Path(dir_path)
+            self._last_model_dir = os.fspath(self._model_path.parent)
+            self.settings.setValue("last_model_dir", self._last_model_dir)
             self.path_label.setText(dir_path)
-            self.status_label.setText(f"已选择: {os.path.basename(dir_path)}")
+            self.status_label.setText(f"已选择: {self._model_path.name}")
+            
+    def update_device_options(self, cuda_available):
+        """根据CUDA是否可用更新设备选项"""
+        if not cuda_available:
+            # CUDA不可用时只保留自动选择和CPU选项
+            for text in ("GPU (CUDA)", "GPU (CUDA, FP16)"):
+                index = self.device_combo.findText(text)
+                if index >= 0:
+                    self.device_combo.removeItem(index)
+        self.update_compile_option(self.device_combo.currentText())
+        
+    def update_compile_option(self, device_choice):
+        """编译只对GPU有明显加速，选择CPU时禁用编译选项"""
+        use_gpu = device_choice in ("GPU (CUDA)", "GPU (CUDA, FP16)") or (
+            device_choice == "自动选择 (优先使用GPU)" and CUDA_AVAILABLE
+        )
+        if not use_gpu:
+            self.compile_check.setChecked(False)
+        self.compile_check.setEnabled(use_gpu)
             
     def update_model_status(self, model_name, model_path):
         """更新模型状态显示"""
@@ -272,45 +572,64 @@ class ModelLoadPage(QWidget):
         else:
             self.current_model_label.setText("尚未加载任何模型")
             
+    def clear_model_cache(self):
+        """清除缓存的模型"""
+        if self.worker is not None and self.worker.isRunning():
+            QMessageBox.warning(self, "警告", "模型正在加载，请稍后再清除缓存！")
+            return
+        transcription_worker = self.main_window.transcription_page.worker
+        if transcription_worker is not None and transcription_worker.isRunning():
+            QMessageBox.warning(self, "警告", "正在转录，请稍后再清除缓存！")
+            return
+        self.status_label.setText("正在清除缓存模型...")
+        self.main_window.clear_model_cache()
+        
     def load_model(self):
         """加载模型"""
-        model_dir = self.path_label.text()
+        model_path = self._model_path
         
-        if model_dir == "未选择模型目录" or not os.path.isdir(model_dir):
+        if model_path is None or not model_path.is_dir():
             QMessageBox.warning(self, "警告", "请先选择有效的模型目录！")
             return
             
+        if not MODEL_AVAILABLE:
+            QMessageBox.warning(self, "警告", "模型模块无法导入，请检查model.py")
+            return
+            
+        transcription_worker = self.main_window.transcription_page.worker
+        if transcription_worker is not None and transcription_worker.isRunning():
+            QMessageBox.warning(self, "警告", "正在转录，请稍后再加载模型！")
+            return
+            
         # 获取设备设置
         device_choice = self.device_combo.currentText()
+        precision = {"GPU (CUDA, FP16)": "fp16", "CPU (BF16)": "bf16"}.get(device_choice, "fp32")
         if device_choice == "自动选择 (优先使用GPU)":
-            device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        elif device_choice == "GPU (CUDA)":
-            if not torch.cuda.is_available():
-                QMessageBox.warning(self, "警告", "CUDA不可用，请检查GPU驱动或选择其他设备！")
-                return
+            device = "cuda:0" if CUDA_AVAILABLE else "cpu"
+        elif device_choice in ("GPU (CUDA)", "GPU (CUDA, FP16)"):
             device = "cuda:0"
         else:
             device = "cpu"
             
-        # 先卸载当前模型（如果有）
-        if self.main_window.model is not None:
-            self.status_label.setText("正在卸载当前模型...")
-            QApplication.processEvents()  # 处理UI更新
-            self.main_window.unload_model()
-            
         # 禁用按钮，显示进度
         self.load_btn.setEnabled(False)
         self.stage_label.setText("正在加载模型...")
         self.progress_bar.setValue(0)
-        self.start_time = time.time()
+        self.time_label.setText("预计剩余时间: --")
+        
+        # 开始计时，剩余时间随进度信号一起更新
+        self.elapsed.start()
+        self._running = True
         
-        # 启动定时器更新剩余时间
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_estimated_time)
-        self.timer.start(1000)  # 每秒更新一次
+        # 先断开界面对当前模型的引用，未命中缓存时加载线程才能真正释放同一GPU上的旧模型
+        self.main_window.unload_model()
         
         # 在工作线程中加载模型
-        self.worker = WorkerThread(model_dir, device)
+        self.worker = WorkerThread(
+            model_path, device,
+            compile_model=self.compile_check.isChecked(),
+            precision=precision
+        )
         self.worker.progress_signal.connect(self.update_progress)
         self.worker.finished_signal.connect(self.model_loaded_callback)
         self.worker.start()
@@ -321,31 +640,29 @@ class ModelLoadPage(QWidget):
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(value)
         self.status_label.setText(message)
+        self.update_estimated_time(value, total)
         
-    def update_estimated_time(self):
-        """更新预计剩余时间"""
-        if hasattr(self, 'start_time') and self.progress_bar.value() > 0:
-            elapsed = time.time() - self.start_time
-            progress = self.progress_bar.value()
-            total = self.progress_bar.maximum()
-            
-            if progress > 0:
-                remaining = (elapsed / progress) * (total - progress)
-                self.time_label.setText(f"预计剩余时间: {remaining:.0f}秒")
-            else:
-                self.time_label.setText("预计剩余时间: --")
+    def update_estimated_time(self, value, total):
+        """根据当前进度更新预计剩余时间"""
+        if not self._running:
+            return
+        if value > 0:
+            remaining = self.elapsed.elapsed() / 1000.0 * (total - value) / max(value, 1)
+            self.time_label.setText(f"预计剩余时间: {remaining:.0f}秒")
+        else:
+            self.time_label.setText("预计剩余时间: --")
         
     def model_loaded_callback(self, model, kwargs, success, message):
         """模型加载完成回调"""
-        # 停止定时器
-        if hasattr(self, 'timer'):
-            self.timer.stop()
+        # 停止计时
+        self._running = False
             
         self.load_btn.setEnabled(True)
         
         if success:
-            model_dir = self.path_label.text()
-            model_name = os.path.basename(model_dir)
+            model_path = self.worker.model_path
+            model_dir = os.fspath(model_path)
+            model_name = model_path.name
             
             # 更新当前模型状态显示
             self.update_model_status(model_name, model_dir)
@@ -366,10 +683,55 @@ class ModelLoadPage(QWidget):
 
 class TranscriptionPage(QWidget):
     """音频转录页面"""
+    
+    # 模型状态标签样式，通过动态属性state切换，无需每次重新设置样式表
+    _STATUS_QSS = """
+        QLabel {
+            padding: 8px; 
+            border-radius: 4px; 
+            font-size: 12px;
+        }
+        QLabel[state="unloaded"] {
+            background: #fff3cd; 
+            border: 1px solid #ffeaa7; 
+            color: #856404;
+        }
+        QLabel[state="loaded"] {
+            background: #d4edda; 
+            border: 1px solid #c3e6cb; 
+            color: #155724;
+        }
+    """
+    
+    # 转录按钮样式
+    _TRANSCRIBE_BTN_QSS = """
+        QPushButton {
+            background-color: #2196F3;
+            color: white;
+            font-size: 14px;
+            padding: 10px;
+            border-radius: 4px;
+            border: none;
+        }
+        QPushButton:hover {
+            background-color: #1976D2;
+        }
+        QPushButton:disabled {
+            background-color: #cccccc;
+        }
+    """
+    
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
         self.worker = None
+        self.audio_paths = []
+        self.elapsed = QElapsedTimer()
+        self._running = False
+        # 记住上次选择的目录
+        self.settings = QSettings("FunASR", "Nano")
+        self._last_audio_dir = self.settings.value("last_audio_dir", HOME_DIR)
+        self._last_output_dir = self.settings.value("last_output_dir", HOME_DIR)
         self.init_ui()
         
     def init_ui(self):
@@ -385,14 +747,8 @@ class TranscriptionPage(QWidget):
         
         # 当前模型状态
         self.model_status_display = QLabel("未加载模型")
-        self.model_status_display.setStyleSheet("""
-            padding: 8px; 
-            background: #fff3cd; 
-            border: 1px solid #ffeaa7; 
-            border-radius: 4px; 
-            color: #856404;
-            font-size: 12px;
-        """)
+        self.model_status_display.setProperty("state", "unloaded")
+        self.model_status_display.setStyleSheet(self._STATUS_QSS)
         layout.addWidget(self.model_status_display)
         
         # 音频文件选择
@@ -412,6 +768,17 @@ class TranscriptionPage(QWidget):
         audio_select_layout.addWidget(audio_browse_btn)
         audio_layout.addLayout(audio_select_layout)
         
+        # 批大小，限制一次送入模型的文件数，避免显存不足
+        batch_layout = QHBoxLayout()
+        batch_layout.addWidget(QLabel("批大小:"))
+        self.batch_spin = QSpinBox()
+        self.batch_spin.setRange(1, 8)
+        self.batch_spin.setValue(4)
+        self.batch_spin.setMaximumWidth(80)
+        batch_layout.addWidget(self.batch_spin)
+        batch_layout.addStretch()
+        audio_layout.addLayout(batch_layout)
+        
         # 支持格式提示
         format_label = QLabel("支持格式: WAV, MP3, FLAC, M4A, OGG 等")
         format_label.setStyleSheet("color: #666; font-size: 11px; padding: 5px;")
@@ -494,22 +861,7 @@ class TranscriptionPage(QWidget):
         
         # 转录按钮
         self.transcribe_btn = QPushButton("开始转录")
-        self.transcribe_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2196F3;
-                color: white;
-                font-size: 14px;
-                padding: 10px;
-                border-radius: 4px;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #1976D2;
-            }
-            QPushButton:disabled {
-                background-color: #cccccc;
-            }
-        """)
+        self.transcribe_btn.setStyleSheet(self._TRANSCRIBE_BTN_QSS)
         self.transcribe_btn.clicked.connect(self.start_transcription)
         self.transcribe_btn.setMinimumHeight(40)
         layout.addWidget(self.transcribe_btn)
@@ -519,55 +871,54 @@ class TranscriptionPage(QWidget):
         
     def update_model_status(self, model_name):
         """更新模型状态显示"""
+        state = "loaded" if model_name else "unloaded"
         if model_name:
             self.model_status_display.setText(f"✓ 已加载模型: {model_name}")
-            self.model_status_display.setStyleSheet("""
-                padding: 8px; 
-                background: #d4edda; 
-                border: 1px solid #c3e6cb; 
-                border-radius: 4px; 
-                color: #155724;
-                font-size: 12px;
-            """)
             self.transcribe_btn.setEnabled(True)
         else:
             self.model_status_display.setText("未加载模型")
-            self.model_status_display.setStyleSheet("""
-                padding: 8px; 
-                background: #fff3cd; 
-                border: 1px solid #ffeaa7; 
-                border-radius: 4px; 
-                color: #856404;
-                font-size: 12px;
-            """)
             self.transcribe_btn.setEnabled(False)
             
+        # 状态变化时只重新应用样式，不重新解析样式表
+        if self.model_status_display.property("state") != state:
+            self.model_status_display.setProperty("state", state)
+            style = self.model_status_display.style()
+            style.unpolish(self.model_status_display)
+            style.polish(self.model_status_display)
+            
     def browse_audio_file(self):
-        """浏览选择音频文件"""
-        file_path, _ = QFileDialog.getOpenFileName(
+        """浏览选择音频文件（可多选）"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self, "选择音频文件",
-            str(Path.home()),
+            self._last_audio_dir,
             "音频文件 (*.wav *.mp3 *.flac *.m4a *.ogg);;所有文件 (*.*)"
         )
-        if file_path:
-            self.audio_label.setText(file_path)
-            self.status_label.setText(f"已选择音频文件: {os.path.basename(file_path)}")
+        if file_paths:
+            self.audio_paths = [Path(p) for p in file_paths]
+            self._last_audio_dir = os.fspath(self.audio_paths[0].parent)
+            self.settings.setValue("last_audio_dir", self._last_audio_dir)
+            if len(file_paths) == 1:
+                self.audio_label.setText(file_paths[0])
+                self.status_label.setText(f"已选择音频文件: {self.audio_paths[0].name}")
+            else:
+                self.audio_label.setText(f"已选择 {len(file_paths)} 个音频文件")
+                self.status_label.setText(f"已选择 {len(file_paths)} 个音频文件")
             
     def browse_output_file(self):
         """浏览选择输出文件"""
         file_path, _ = QFileDialog.getSaveFileName(
             self, "选择输出文件",
-            str(Path.home()),
+            self._last_output_dir,
             "文本文件 (*.txt);;所有文件 (*.*)"
         )
         if file_path:
+            self._last_output_dir = os.fspath(Path(file_path).parent)
+            self.settings.setValue("last_output_dir", self._last_output_dir)
             self.output_label.setText(file_path)
             
     def start_transcription(self):
         """开始转录"""
-        audio_path = self.audio_label.text()
-        
-        if audio_path == "未选择音频文件" or not os.path.isfile(audio_path):
+        if not self.audio_paths or not all(p.is_file() for p in self.audio_paths):
             QMessageBox.warning(self, "警告", "请先选择有效的音频文件！")
             return
             
@@ -584,49 +935,53 @@ class TranscriptionPage(QWidget):
         self.transcribe_btn.setEnabled(False)
         self.stage_label.setText("开始转录...")
         self.progress_bar.setValue(0)
-        self.start_time = time.time()
+        self.result_text.clear()
+        self.time_label.setText("预计剩余时间: --")
         
-        # 启动定时器更新剩余时间
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_estimated_time)
-        self.timer.start(1000)  # 每秒更新一次
+        # 开始计时，剩余时间随进度信号一起更新
+        self.elapsed.start()
+        self._running = True
         
         # 在工作线程中执行转录
         self.worker = TranscriptionThread(
             self.main_window.model,
             self.main_window.model_kwargs,
-            audio_path,
-            output_path
+            self.audio_paths,
+            output_path,
+            batch_size=self.batch_spin.value()
         )
         self.worker.progress_signal.connect(self.update_transcription_progress)
+        self.worker.partial_result_signal.connect(self.append_partial_result)
         self.worker.result_signal.connect(self.transcription_finished)
         self.worker.start()
         
+    def append_partial_result(self, text):
+        """追加部分识别结果，只重新排版新增的部分"""
+        self.result_text.moveCursor(QTextCursor.End)
+        self.result_text.insertPlainText(text)
+        
     def update_transcription_progress(self, stage, value, total, message):
         """更新转录进度"""
         self.stage_label.setText(stage)
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(value)
         self.status_label.setText(message)
+        self.update_estimated_time(value, total)
         
-    def update_estimated_time(self):
-        """更新预计剩余时间"""
-        if hasattr(self, 'start_time') and self.progress_bar.value() > 0:
-            elapsed = time.time() - self.start_time
-            progress = self.progress_bar.value()
-            total = self.progress_bar.maximum()
-            
-            if progress > 0:
-                remaining = (elapsed / progress) * (total - progress)
-                self.time_label.setText(f"预计剩余时间: {remaining:.0f}秒")
-            else:
-                self.time_label.setText("预计剩余时间: --")
+    def update_estimated_time(self, value, total):
+        """根据当前进度更新预计剩余时间"""
+        if not self._running:
+            return
+        if value > 0:
+            remaining = self.elapsed.elapsed() / 1000.0 * (total - value) / max(value, 1)
+            self.time_label.setText(f"预计剩余时间: {remaining:.0f}秒")
+        else:
+            self.time_label.setText("预计剩余时间: --")
         
     def transcription_finished(self, result, success, message):
         """转录完成回调"""
-        # 停止定时器
-        if hasattr(self, 'timer'):
-            self.timer.stop()
+        # 停止计时
+        self._running = False
             
         self.transcribe_btn.setEnabled(True)
         
@@ -635,11 +990,6 @@ class TranscriptionPage(QWidget):
             self.result_text.setText(result)
             self.copy_btn.setEnabled(True)
             self.time_label.setText("转录完成！")
-            
-            # 转录完成后进行垃圾回收
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
         else:
             self.status_label.setText(f"转录失败: {message}")
             self.time_label.setText("转录失败")
@@ -665,8 +1015,37 @@ class MainWindow(QMainWindow):
         self.model = None
         self.model_kwargs = None
         self.current_model_name = ""
+        self.unload_thread = None
         self.init_ui()
         
+        # 依赖库加载完成前禁止加载模型
+        self.model_page.load_btn.setEnabled(False)
+        self.model_page.status_label.setText("正在加载依赖库...")
+        
+        # 窗口显示后再开始预加载
+        self.preload_thread = PreloadThread()
+        self.preload_thread.preload_finished.connect(self.on_preload_finished)
+        QTimer.singleShot(0, self.preload_thread.start)
+        
+    def on_preload_finished(self, model_available, error):
+        """依赖库预加载完成"""
+        self.model_page.load_btn.setEnabled(True)
+        self.model_page.status_label.setText("等待操作...")
+        self.model_page.update_device_options(CUDA_AVAILABLE)
+            
+        # 检查依赖
+        if not model_available:
+            reply = QMessageBox.question(
+                self, "缺少模型模块",
+                "无法导入model.py模块。\n\n"
+                "请确保model.py文件在当前目录中，并且所有依赖已安装。\n\n"
+                "是否要继续运行？",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            if reply == QMessageBox.No:
+                QApplication.exit(1)
+        
     def init_ui(self):
         self.setWindowTitle("FunASR-Nano 语音识别工具")
         self.setGeometry(100, 100, 700, 650)
@@ -775,116 +1154,50 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage("音频转录页面 - 已加载模型")
             
     def unload_model(self):
-        """彻底卸载当前模型，释放所有内存"""
+        """卸载当前模型，模型本身保留在缓存中以便快速重新加载"""
+        # 已结束的转录线程仍持有模型引用，一并释放，保证缓存是模型的最后一个引用
+        self.transcription_page.worker = None
         if self.model is not None:
-            try:
-                print("开始卸载模型...")
-                
-                # 1. 清除进度回调
-                if hasattr(self.model, 'set_progress_callback'):
-                    self.model.set_progress_callback(None)
-                
-                # 2. 获取所有子模块引用
-                submodules = []
-                if hasattr(self.model, 'audio_encoder'):
-                    submodules.append(self.model.audio_encoder)
-                if hasattr(self.model, 'audio_adaptor'):
-                    submodules.append(self.model.audio_adaptor)
-                if hasattr(self.model, 'llm'):
-                    submodules.append(self.model.llm)
-                
-                # 3. 将模型移到CPU（如果它在GPU上）
-                if next(self.model.parameters()).is_cuda:
-                    self.model.to('cpu')
-                
-                # 4. 删除所有子模块的属性
-                if hasattr(self.model, 'audio_encoder'):
-                    self.model.audio_encoder = None
-                if hasattr(self.model, 'audio_adaptor'):
-                    self.model.audio_adaptor = None
-                if hasattr(self.model, 'llm'):
-                    self.model.llm = None
-                
-                # 5. 删除模型对象
-                del self.model
-                self.model = None
-                
-                # 6. 删除所有子模块
-                for module in submodules:
-                    if module is not None:
-                        # 递归删除子模块
-                        self._recursive_delete(module)
+            # 清除进度回调
+            if hasattr(self.model, 'set_progress_callback'):
+                self.model.set_progress_callback(None)
+                self.model.set_partial_result_callback(None)
                 
-                # 7. 删除kwargs
-                if self.model_kwargs is not None:
-                    # 清理kwargs中可能的张量
-                    for key, value in list(self.model_kwargs.items()):
-                        if isinstance(value, torch.Tensor):
-                            del value
-                    self.model_kwargs.clear()
-                    self.model_kwargs = None
-                
-                # 8. 强制垃圾回收
-                gc.collect()
-                
-                # 9. 清理GPU缓存
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
-                    torch.cuda.ipc_collect()
-                
-                # 10. 再次垃圾回收确保清理
-                gc.collect()
-                
-                # 更新状态
-                self.current_model_name = ""
-                
-                # 更新页面显示
-                self.model_page.update_model_status("", "")
-                self.transcription_page.update_model_status("")
-                
-                print("模型卸载完成")
-                
-            except Exception as e:
-                print(f"卸载模型时出错: {str(e)}")
-                import traceback
-                traceback.print_exc()
-    
-    def _recursive_delete(self, module):
-        """递归删除模块及其子模块"""
-        if module is None:
-            return
+            self.model = None
+            self.model_kwargs = None
             
-        try:
-            # 如果是nn.Module，先删除其子模块
-            if isinstance(module, torch.nn.Module):
-                # 获取所有子模块名称
-                children_names = list(module._modules.keys())
-                for name in children_names:
-                    child = module._modules.get(name, None)
-                    if child is not None:
-                        # 递归删除子模块
-                        self._recursive_delete(child)
-                        # 从父模块中移除
-                        module._modules.pop(name, None)
-                
-                # 删除参数
-                for param_name, param in list(module._parameters.items()):
-                    if param is not None:
-                        del param
-                        module._parameters.pop(param_name, None)
-                
-                # 删除缓冲区
-                for buffer_name, buffer in list(module._buffers.items()):
-                    if buffer is not None:
-                        del buffer
-                        module._buffers.pop(buffer_name, None)
+            # 更新状态
+            self.current_model_name = ""
             
-            # 删除模块本身
-            del module
+            # 更新页面显示
+            self.model_page.update_model_status("", "")
+            self.transcription_page.update_model_status("")
             
-        except Exception as e:
-            print(f"删除模块时出错: {str(e)}")
-                
+    def clear_model_cache(self):
+        """清除所有缓存的模型，实际释放在后台线程中进行"""
+        self.unload_model()
+        if not _MODEL_CACHE:
+            self.model_page.status_label.setText("没有需要清除的缓存模型")
+            return
+            
+        entries = list(_MODEL_CACHE.values())
+        _MODEL_CACHE.clear()
+        
+        # 释放期间禁止加载新模型
+        self.model_page.load_btn.setEnabled(False)
+        self.model_page.clear_cache_btn.setEnabled(False)
+        self.unload_thread = UnloadThread(entries)
+        self.unload_thread.finished.connect(self.on_model_cache_cleared)
+        self.unload_thread.start()
+        
+    def on_model_cache_cleared(self):
+        """缓存模型释放完成"""
+        self.unload_thread = None
+        self.model_page.load_btn.setEnabled(True)
+        self.model_page.clear_cache_btn.setEnabled(True)
+        self.model_page.status_label.setText("已清除缓存模型")
+        self.statusBar().showMessage("已清除缓存模型")
+    
     def on_model_loaded(self, model, kwargs, model_dir):
         """处理模型加载完成信号"""
         # 先卸载当前模型（如果有）
@@ -893,14 +1206,9 @@ class MainWindow(QMainWindow):
             
         self.model = model
         self.model_kwargs = kwargs
-        self.current_model_name = os.path.basename(model_dir)
+        self.current_model_name = Path(model_dir).name
         
         if model:
-            # 加载完成后进行垃圾回收，清理加载过程中的临时变量
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-            
             self.statusBar().showMessage(f"模型加载成功: {self.current_model_name}")
             
             # 更新两个页面的模型状态显示
@@ -914,35 +1222,50 @@ class MainWindow(QMainWindow):
             
     def closeEvent(self, event):
         """窗口关闭事件"""
-        # 彻底卸载模型
-        self.unload_model()
+        # 加载或转录线程（及其音频预取线程）运行中时关闭会中止进程，先拒绝关闭
+        load_worker = self.model_page.worker
+        if load_worker is not None and load_worker.isRunning():
+            QMessageBox.warning(self, "警告", "模型正在加载，请稍后再关闭！")
+            event.ignore()
+            return
+        transcription_worker = self.transcription_page.worker
+        if transcription_worker is not None and transcription_worker.isRunning():
+            QMessageBox.warning(self, "警告", "正在转录，请稍后再关闭！")
+            event.ignore()
+            return
+            
+        # 等待预加载线程和正在进行的卸载结束
+        self.preload_thread.wait()
+        if self.unload_thread is not None:
+            self.unload_thread.wait()
+        # 进程退出时内存和显存由系统回收，只断开当前引用，不逐个拆解缓存中的模型
+        self.model = None
+        self.model_kwargs = None
         event.accept()
 
 
 def main():
     """主函数"""
+    # 默认只输出警告及以上，info级别的诊断信息不会被格式化
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # 不读取桌面主题设置，样式和字体完全由程序指定（必须在创建QApplication之前调用）
+    QApplication.setDesktopSettingsAware(False)
     app = QApplication(sys.argv)
     
     # 设置应用样式
     app.setStyle("Fusion")
     
-    # 设置应用字体
-    font = QFont("Microsoft YaHei", 9)
+    # 设置应用字体，启动时解析一次可用的中文字体，避免每个控件都走字体回退
+    families = set(QFontDatabase.families())
+    family = next(
+        (f for f in ("Microsoft YaHei", "PingFang SC", "Noto Sans CJK SC") if f in families), None
+    )
+    font = app.font()
+    if family:
+        font.setFamily(family)
+    font.setPointSize(9)
     app.setFont(font)
     
-    # 检查依赖
-    if not MODEL_AVAILABLE:
-        reply = QMessageBox.question(
-            None, "缺少模型模块",
-            "无法导入model.py模块。\n\n"
-            "请确保model.py文件在当前目录中，并且所有依赖已安装。\n\n"
-            "是否要继续运行？",
-            QMessageBox.Yes | QMessageBox.No,
-            QMessageBox.No
-        )
-        if reply == QMessageBox.No:
-            sys.exit(1)
-    
     window = MainWindow()
     window.show()
     
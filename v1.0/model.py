@@ -15,12 +15,24 @@ from funasr.register import tables
 from funasr.train_utils.device_funcs import force_gatherable, to_device
 from funasr.utils.datadir_writer import DatadirWriter
 from funasr.utils.load_utils import extract_fbank, load_audio_text_image_video
-from transformers import AutoConfig, AutoModelForCausalLM
+from transformers import AutoConfig, AutoModelForCausalLM, TextStreamer
 from tqdm import tqdm
 
 dtype_map = {"bf16": torch.bfloat16, "fp16": torch.float16, "fp32": torch.float32}
 
 
+class PartialTextStreamer(TextStreamer):
+    """生成过程中把已确定的文本片段交给回调"""
+
+    def __init__(self, tokenizer, callback, **decode_kwargs):
+        super().__init__(tokenizer, skip_prompt=True, **decode_kwargs)
+        self.callback = callback
+
+    def on_finalized_text(self, text, stream_end=False):
+        if text:
+            self.callback(text)
+
+
 @tables.register("model_classes", "FunASRNano")
 class FunASRNano(nn.Module):
     def __init__(
@@ -39,6 +51,11 @@ class FunASRNano(nn.Module):
 
         # 进度回调函数
         self.progress_callback = None
+        self.partial_result_callback = None
+
+        # 复用的锁页内存缓冲区，用于把特征异步拷贝到GPU
+        self._pinned_buffer = None
+        self._pinned_event = None
         self.progress_stage = ""
         self.progress_value = 0
         self.progress_total = 100
@@ -138,7 +155,41 @@ class FunASRNano(nn.Module):
     def set_progress_callback(self, callback):
         """设置进度回调函数"""
         self.progress_callback = callback
+
+    def set_partial_result_callback(self, callback):
+        """设置部分识别结果回调函数，生成文本时逐段回调"""
+        self.partial_result_callback = callback
         
+    def _staging_tensor(self, shape, dtype):
+        """返回复用的锁页内存缓冲区中指定形状的视图，只在容量不足时重新分配"""
+        numel = torch.Size(shape).numel()
+        if (
+            self._pinned_buffer is None
+            or self._pinned_buffer.numel() < numel
+            or self._pinned_buffer.dtype != dtype
+        ):
+            self._pinned_buffer = torch.empty(numel, dtype=dtype, pin_memory=True)
+        elif self._pinned_event is not None:
+            # 上一次拷贝完成后才能覆盖缓冲区
+            self._pinned_event.synchronize()
+        return self._pinned_buffer[:numel].view(shape)
+
+    def _upload_staging(self, staging, device):
+        """把锁页缓冲区中的数据异步拷贝到GPU，并记录拷贝完成事件"""
+        speech = staging.to(device, non_blocking=True)
+        self._pinned_event = torch.cuda.Event()
+        self._pinned_event.record()
+        return speech
+
+    def _upload_speech(self, speech, device):
+        """经由复用的锁页内存缓冲区把特征异步拷贝到目标设备"""
+        if torch.device(device).type != "cuda":
+            return speech.to(device)
+
+        staging = self._staging_tensor(speech.shape, speech.dtype)
+        staging.copy_(speech)
+        return self._upload_staging(staging, device)
+
     def _update_progress(self, stage, value, total=100, message=""):
         """更新进度"""
         self.progress_stage = stage
@@ -492,7 +543,9 @@ class FunASRNano(nn.Module):
         
         # 更新进度
         self._update_progress("移动数据到设备", 20, 100, "正在移动数据到指定设备...")
-        batch = to_device(output, kwargs["device"])
+        if len(output["speech"]) > 0:
+            output["speech"] = self._upload_speech(output["speech"], kwargs["device"])
+        batch = to_device(output, kwargs["device"], non_blocking=True)
 
         # audio encoder
         speech = batch["speech"]
@@ -572,6 +625,104 @@ class FunASRNano(nn.Module):
                     speech_idx += 1
         return inputs_embeds, contents, batch, source_ids, meta_data
 
+    def inference_prepare_batch(
+        self,
+        data_in,
+        tokenizer=None,
+        frontend=None,
+        **kwargs,
+    ):
+        """批量准备LLM输入，多个音频共用一次编码器前向，输出左填充的嵌入"""
+        meta_data = {}
+        device = kwargs["device"]
+
+        # 更新进度
+        self._update_progress("准备数据", 10, 100, f"正在准备{len(data_in)}个音频的数据...")
+        contents_list = [self.data_template(data) for data in data_in]
+        outputs = [
+            self.data_load_speech(
+                contents, tokenizer, frontend, meta_data=meta_data, **kwargs
+            )
+            for contents in contents_list
+        ]
+
+        # 将各音频的特征按时间维度填充到同一长度
+        feats = []
+        for output in outputs:
+            feat = output["speech"][0]
+            feats.append(feat.transpose(0, 1) if self.feat_permute else feat)
+        shape = (len(feats), max(feat.shape[0] for feat in feats), feats[0].shape[1])
+        on_cuda = torch.device(device).type == "cuda"
+        # GPU上直接在复用的锁页缓冲区中填充，省去中间张量的分配和一次额外拷贝
+        if on_cuda:
+            speech = self._staging_tensor(shape, feats[0].dtype)
+        else:
+            speech = feats[0].new_empty(shape)
+        speech.zero_()
+        for i, feat in enumerate(feats):
+            speech[i, : feat.shape[0]] = feat
+        if self.feat_permute:
+            speech = speech.permute(0, 2, 1)
+        speech_lengths = torch.cat(
+            [output["speech_lengths"][:, 0] for output in outputs]
+        )
+
+        # 更新进度
+        self._update_progress("移动数据到设备", 20, 100, "正在移动数据到指定设备...")
+        if on_cuda:
+            speech = self._upload_staging(speech, device)
+        speech_lengths = speech_lengths.to(device)
+        if kwargs.get("fp16", False):
+            speech = speech.to(torch.float16)
+        elif kwargs.get("bf16", False):
+            speech = speech.to(torch.bfloat16)
+
+        # 更新进度
+        self._update_progress("音频编码", 30, 100, "正在运行音频编码器...")
+        encoder_out, encoder_out_lens = self.encode(speech, speech_lengths)
+
+        # 更新进度
+        self._update_progress("音频适配器", 40, 100, "正在运行音频适配器...")
+        encoder_out, encoder_out_lens = self.audio_adaptor(encoder_out, encoder_out_lens)
+        meta_data["audio_adaptor_out"] = encoder_out
+        meta_data["audio_adaptor_out_lens"] = encoder_out_lens
+
+        # 更新进度
+        self._update_progress("嵌入语音特征", 50, 100, "正在嵌入语音特征到LLM输入...")
+        embedding = self.llm.model.get_input_embeddings()
+        embeds_list = []
+        for speech_idx, output in enumerate(outputs):
+            source_ids = output["source_ids"].to(device)
+            source_ids[source_ids < 0] = 0
+            inputs_embeds = embedding(source_ids)[0]
+            fbank_beg = output["fbank_beg"][0]
+            fake_token_len = output["fake_token_len"][0]
+            for turn_id in range(fbank_beg.shape[0]):
+                fbank_beg_idx = fbank_beg[turn_id].item()
+                if fbank_beg_idx > 0:
+                    speech_token_len = min(
+                        fake_token_len[turn_id].item(),
+                        encoder_out_lens[speech_idx].item(),
+                    )
+                    inputs_embeds[
+                        fbank_beg_idx : fbank_beg_idx + speech_token_len, :
+                    ] = encoder_out[speech_idx, :speech_token_len, :]
+            embeds_list.append(inputs_embeds)
+
+        # 左填充，保证生成时各条样本从同一位置开始续写
+        max_len = max(embeds.shape[0] for embeds in embeds_list)
+        batch_size = len(embeds_list)
+        dims = embeds_list[0].shape[-1]
+        inputs_embeds = embeds_list[0].new_zeros(batch_size, max_len, dims)
+        attention_mask = torch.zeros(
+            batch_size, max_len, dtype=torch.long, device=inputs_embeds.device
+        )
+        for batch_idx, embeds in enumerate(embeds_list):
+            inputs_embeds[batch_idx, max_len - embeds.shape[0] :, :] = embeds
+            attention_mask[batch_idx, max_len - embeds.shape[0] :] = 1
+
+        return inputs_embeds, attention_mask, contents_list, meta_data
+
     def inference(
         self,
         data_in,
@@ -651,29 +802,23 @@ class FunASRNano(nn.Module):
         frontend=None,
         **kwargs,
     ):
+        if len(data_in) > 1:
+            return self.inference_llm_batch(
+                data_in, key=key, tokenizer=tokenizer, frontend=frontend, **kwargs
+            )
+
         # 重置进度
         self._update_progress("开始推理", 0, 100, "开始语音识别推理...")
         
         inputs_embeds, contents, batch, source_ids, meta_data = self.inference_prepare(
             data_in, data_lengths, key, tokenizer, frontend, **kwargs
         )
-        llm_dtype = kwargs.get("llm_dtype", "fp32")
-        if llm_dtype == "fp32":
-            llm_dtype = "fp16" if kwargs.get("fp16", False) else llm_dtype
-            llm_dtype = "bf16" if kwargs.get("bf16", False) else llm_dtype
-
-        device_type = torch.device(kwargs.get("device", "cuda")).type
-        
         # 更新进度
         self._update_progress("准备LLM", 60, 100, "正在准备语言模型...")
-        with torch.autocast(
-            device_type=device_type if device_type in ["cuda", "mps"] else "cpu",
-            enabled=True if llm_dtype != "fp32" else False,
-            dtype=dtype_map[llm_dtype]
-        ):
+        autocast, llm_dtype = self._llm_autocast(**kwargs)
+        with autocast:
             label = contents["assistant"][-1]
-            self.llm = self.llm.to(dtype_map[llm_dtype])
-            inputs_embeds = inputs_embeds.to(dtype_map[llm_dtype])
+            inputs_embeds = inputs_embeds.to(llm_dtype)
             llm_kwargs = kwargs.get("llm_kwargs", {})
             
             if not kwargs.get("teachforing", False):
@@ -683,6 +828,8 @@ class FunASRNano(nn.Module):
                 generated_ids = self._generate_with_progress(
                     inputs_embeds=inputs_embeds,
                     max_new_tokens=kwargs.get("max_length", 512),
+                    tokenizer=tokenizer,
+                    skip_special_tokens=kwargs.get("skip_special_tokens", True),
                     **llm_kwargs
                 )
 
@@ -713,6 +860,76 @@ class FunASRNano(nn.Module):
                 )[0]
                 loss = model_outputs.loss.item()
 
+        results = self._build_results([response], [label], key, loss=loss, **kwargs)
+
+        # 更新进度 - 完成
+        self._update_progress("完成", 100, 100, "推理完成！")
+        
+        return results, meta_data
+
+    def inference_llm_batch(
+        self,
+        data_in,
+        key: list = None,
+        tokenizer=None,
+        frontend=None,
+        **kwargs,
+    ):
+        """多个音频一次前向、一次generate完成识别"""
+        # 重置进度
+        self._update_progress("开始推理", 0, 100, "开始批量语音识别推理...")
+
+        inputs_embeds, attention_mask, contents_list, meta_data = (
+            self.inference_prepare_batch(
+                data_in, tokenizer=tokenizer, frontend=frontend, **kwargs
+            )
+        )
+        # 更新进度
+        self._update_progress("准备LLM", 60, 100, "正在准备语言模型...")
+        autocast, llm_dtype = self._llm_autocast(**kwargs)
+        with autocast:
+            inputs_embeds = inputs_embeds.to(llm_dtype)
+            llm_kwargs = kwargs.get("llm_kwargs", {})
+
+            # 更新进度
+            self._update_progress("生成文本", 70, 100, "正在生成文本...")
+            generated_ids = self._generate_with_progress(
+                inputs_embeds=inputs_embeds,
+                max_new_tokens=kwargs.get("max_length", 512),
+                attention_mask=attention_mask,
+                **llm_kwargs
+            )
+            responses = tokenizer.batch_decode(
+                generated_ids,
+                skip_special_tokens=kwargs.get("skip_special_tokens", True),
+            )
+
+        labels = [contents["assistant"][-1] for contents in contents_list]
+        results = self._build_results(responses, labels, key, **kwargs)
+
+        # 更新进度 - 完成
+        self._update_progress("完成", 100, 100, "推理完成！")
+
+        return results, meta_data
+
+    def _llm_autocast(self, **kwargs):
+        """确定LLM推理精度并把LLM转为该精度，返回(autocast上下文, dtype)"""
+        llm_dtype = kwargs.get("llm_dtype", "fp32")
+        if llm_dtype == "fp32":
+            llm_dtype = "fp16" if kwargs.get("fp16", False) else llm_dtype
+            llm_dtype = "bf16" if kwargs.get("bf16", False) else llm_dtype
+
+        device_type = torch.device(kwargs.get("device", "cuda")).type
+        self.llm = self.llm.to(dtype_map[llm_dtype])
+        autocast = torch.autocast(
+            device_type=device_type if device_type in ["cuda", "mps"] else "cpu",
+            enabled=True if llm_dtype != "fp32" else False,
+            dtype=dtype_map[llm_dtype]
+        )
+        return autocast, dtype_map[llm_dtype]
+
+    def _build_results(self, responses, labels, key, loss=None, **kwargs):
+        """后处理生成的文本并构造每条音频的结果，指定output_dir时同时写入文件"""
         ibest_writer = None
         if kwargs.get("output_dir") is not None:
             if not hasattr(self, "writer"):
@@ -722,41 +939,52 @@ class FunASRNano(nn.Module):
         # 更新进度
         self._update_progress("后处理", 90, 100, "正在进行后处理...")
         results = []
-        response_clean = re.sub(r"[^\w\s\u3000\u4e00-\u9fff]+", "", response)
-        result_i = {
-            "key": key[0],
-            "text": re.sub(r'\s+', ' ', response.replace("/sil", " ")),
-            "text_tn": response_clean,
-            "label": label,
-        }
-        if loss is not None:
-            result_i["loss"] = loss
-        results.append(result_i)
-
-        if ibest_writer is not None:
-            ibest_writer["text"][key[0]] = response.replace("\n", " ")
-            ibest_writer["label"][key[0]] = label.replace("\n", " ")
-            ibest_writer["text_tn"][key[0]] = response_clean
-
-        # 更新进度 - 完成
-        self._update_progress("完成", 100, 100, "推理完成！")
-        
-        return results, meta_data
+        for i, (response, label) in enumerate(zip(responses, labels)):
+            response_clean = re.sub(r"[^\w\s\u3000\u4e00-\u9fff]+", "", response)
+            result_i = {
+                "key": key[i],
+                "text": re.sub(r'\s+', ' ', response.replace("/sil", " ")),
+                "text_tn": response_clean,
+                "label": label,
+            }
+            if loss is not None:
+                result_i["loss"] = loss
+            results.append(result_i)
+
+            if ibest_writer is not None:
+                ibest_writer["text"][key[i]] = response.replace("\n", " ")
+                ibest_writer["label"][key[i]] = label.replace("\n", " ")
+                ibest_writer["text_tn"][key[i]] = response_clean
+
+        return results
     
-    def _generate_with_progress(self, inputs_embeds, max_new_tokens=512, **kwargs):
+    def _generate_with_progress(
+        self,
+        inputs_embeds,
+        max_new_tokens=512,
+        tokenizer=None,
+        skip_special_tokens=True,
+        **kwargs,
+    ):
         """带有进度监控的生成函数"""
         # 设置生成配置
         generation_config = self.llm.generation_config
         generation_config.max_new_tokens = max_new_tokens
         
-        # 开始生成
-        generated_ids = []
+        # 生成进度难以准确跟踪，这里只报告一次
+        self._update_progress("生成文本", 75, 100, "正在生成文本...")
         
-        # 使用模型生成（简化版本，实际中可能需要更复杂的进度跟踪）
-        # 这里我们使用一个简单的进度模拟，因为实际生成进度很难准确跟踪
-        for i in range(10):  # 模拟10个步骤
-            time.sleep(0.1)  # 模拟处理时间
-            self._update_progress("生成文本", 70 + i * 2, 100, f"正在生成文本... ({i+1}/10)")
+        # 单条生成时流式输出部分结果（transformers的streamer不支持批量）
+        if (
+            self.partial_result_callback is not None
+            and tokenizer is not None
+            and inputs_embeds.shape[0] == 1
+        ):
+            kwargs["streamer"] = PartialTextStreamer(
+                tokenizer,
+                self.partial_result_callback,
+                skip_special_tokens=skip_special_tokens,
+            )
         
         # 实际生成调用
         generated_ids = self.llm.generate(
@@ -771,6 +999,25 @@ class FunASRNano(nn.Module):
     def from_pretrained(model: str = None, **kwargs):
         from funasr import AutoModel
 
+        # funasr内部用torch.load读取权重，开启mmap后按需分页读取，不必先把整份checkpoint拷入内存。
+        # 注意该开关是进程级的，开启期间其他线程中的torch.load也会使用mmap
+        try:
+            from torch.utils.serialization import config as serialization_config
+        except ImportError:  # torch < 2.5
+            serialization_config = None
+        if serialization_config is not None:
+            prev_mmap = serialization_config.load.mmap
+            serialization_config.load.mmap = True
+            try:
+                return AutoModel.build_model(
+                    model=model, trust_remote_code=True, **kwargs
+                )
+            except (RuntimeError, ValueError) as e:
+                # 旧格式(非zipfile)的checkpoint或BytesIO等文件对象不支持mmap，关闭mmap后重试一次
+                logging.warning(f"mmap load failed, retrying without mmap: {e}")
+            finally:
+                serialization_config.load.mmap = prev_mmap
+
         model, kwargs = AutoModel.build_model(
             model=model, trust_remote_code=True, **kwargs
         )